@@ -3,23 +3,53 @@ import requests
 import pandas as pd
 import time
 import json
+import logging
+import os
+import sys
 import urllib.parse
 from datetime import datetime, timedelta
 import re
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import unicodedata
+import argparse
+import contextlib
+import cProfile
+import csv
+import io
+import itertools
+import marshal
+import pstats
+import threading
+import tracemalloc
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, as_completed
+from concurrent.futures import wait as futures_wait
+from concurrent.futures import TimeoutError as FuturesTimeoutError
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+from scipy import sparse
+from scipy.sparse.csgraph import connected_components
+
+# `python app.py --serve` で起動した場合はHTTP APIサーバーとして動作する
+SERVER_MODE = "--serve" in sys.argv and not st.runtime.exists()
+
+logger = logging.getLogger("keyword_genie")
 
 # ページ設定を最初に配置
-st.set_page_config(
-    page_title="SEOキーワード発想支援ツール",
-    layout="wide",
-    initial_sidebar_state="expanded"
-)
+if not SERVER_MODE:
+    st.set_page_config(
+        page_title="SEOキーワード発想支援ツール",
+        layout="wide",
+        initial_sidebar_state="expanded"
+    )
 
 # --- Googleトレンド機能（無料・軽量版） ---
-def get_google_trends_data():
+def get_google_trends_data(notify=True):
     """
     pytrendsライブラリが利用できない場合の代替トレンドキーワード生成
     一般的にトレンドになりやすいキーワードパターンを返す
+    notify=False の場合は画面に警告を出さない（バックグラウンド処理用）
     """
     try:
         # pytrends のインポートを試行
@@ -41,7 +71,8 @@ def get_google_trends_data():
         # pytrendsがない場合はフォールバック
         return get_trending_keywords_fallback(), False
     except Exception as e:
-        st.warning(f"Googleトレンドの取得でエラー: {e}")
+        if notify:
+            st.warning(f"Googleトレンドの取得でエラー: {e}")
         return get_trending_keywords_fallback(), False
 
 def get_trending_keywords_fallback():
@@ -113,85 +144,1178 @@ def get_yahoo_realtime_alternative(keyword):
     return realtime_keywords
 
 # --- コア機能：Googleサジェストを取得（改良版） ---
-def get_google_suggestions_batch(base_keyword):
+SUGGEST_LETTERS = "abcdefghijklmnopqrstuvwxyzあいうえおかきくけこさしすせそたちつてとなにぬねのはひふへほまみむめもやゆよらりるれろわをん"
+
+# 接続先は環境変数で差し替え可能（ローカルのスタブサーバーでの動作確認用）
+SUGGEST_URL_TEMPLATE = os.environ.get(
+    "KEYWORD_GENIE_SUGGEST_URL",
+    "http://suggestqueries.google.com/complete/search?client=firefox&hl=ja&q={}"
+)
+
+SUGGEST_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:120.0) Gecko/20100101 Firefox/120.0',
+    'Accept': 'application/json, text/plain, */*',
+    'Accept-Language': 'ja,en-US;q=0.9,en;q=0.8',
+    'Accept-Encoding': 'gzip, deflate',
+    'DNT': '1',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+}
+
+class SuggestCache:
     """
-    並列処理でGoogleサジェストを効率的に取得
+    サジェスト結果の共有キャッシュ（スレッドセーフ・有効期限付き）
+    """
+
+    def __init__(self, ttl=3600, max_entries=50000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, value = entry
+            if time.monotonic() - stored_at > self.ttl:
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            if key not in self._entries and len(self._entries) >= self.max_entries:
+                # 最も古いエントリから削除
+                del self._entries[next(iter(self._entries))]
+            self._entries[key] = (time.monotonic(), value)
+
+def create_http_session(pool_size=10):
+    """
+    接続を使い回すためのHTTPセッションを作成する
+    """
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update(SUGGEST_HEADERS)
+    return session
+
+class RateLimiter:
+    """
+    トークンバケット方式のリクエスト間隔制御（複数スレッドで共有可能）
+    """
+
+    def __init__(self, rate, burst=1):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+
+    def acquire(self):
+        """
+        リクエスト枠を1つ取得する（close() 後は待機をやめて False を返す）
+        """
+        while not self._closed.is_set():
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            self._closed.wait(wait)
+        return False
+
+    def close(self):
+        self._closed.set()
+
+def build_suggest_queries(base_keyword):
+    """
+    メインキーワードと「メインキーワード + 1文字」の検索クエリ一覧を作成する
+    """
+    return [base_keyword] + [f"{base_keyword} {letter}" for letter in SUGGEST_LETTERS]
+
+def fetch_suggestions(query, session=None, cache=None, url_template=None, timeout=10, rate_limiter=None):
+    """
+    1クエリ分のGoogleサジェストを取得する（キャッシュがあれば再利用）
+    rate_limiter を渡すと、キャッシュにない場合のみリクエスト枠を消費する
+    """
+    if cache is not None:
+        cached = cache.get(query)
+        if cached is not None:
+            return cached, None
+
+    if rate_limiter is not None and not rate_limiter.acquire():
+        return set(), f"取り消し: {query}"
+
+    try:
+        encoded_query = urllib.parse.quote_plus(query)
+        url = (url_template or SUGGEST_URL_TEMPLATE).format(encoded_query)
+
+        if session is None:
+            response = requests.get(url, headers=SUGGEST_HEADERS, timeout=timeout)
+        else:
+            response = session.get(url, timeout=timeout)
+        response.raise_for_status()
+        response.encoding = 'utf-8'
+
+        suggestions = json.loads(response.text)
+
+        query_keywords = set()
+        if len(suggestions) > 1 and suggestions[1]:
+            for suggestion in suggestions[1]:
+                if suggestion and len(suggestion.strip()) > 0:
+                    query_keywords.add(suggestion.strip())
+
+        query_keywords = frozenset(query_keywords)
+        if cache is not None:
+            cache.set(query, query_keywords)
+        return query_keywords, None
+
+    except requests.exceptions.RequestException as e:
+        return set(), f"リクエストエラー: {query} ({e})"
+    except json.JSONDecodeError as e:
+        return set(), f"レスポンス解析エラー: {query} ({e})"
+    except Exception as e:
+        return set(), f"不明なエラー: {query} ({e})"
+
+def collect_google_suggestions(base_keyword, session=None, cache=None, executor=None,
+                               max_workers=5, deadline=None, progress_callback=None, delay=0.05,
+                               rate_limiter=None):
+    """
+    全クエリのサジェストを並列に取得し、(キーワード一覧, エラー一覧, 時間切れか) を返す
+    executor / rate_limiter を渡すと、複数の呼び出し元で同じスレッドプールとリクエスト枠を共有する
     """
-    suggest_letters = "abcdefghijklmnopqrstuvwxyzあいうえおかきくけこさしすせそたちつてとなにぬねのはひふへほまみむめもやゆよらりるれろわをん"
     keywords = set([base_keyword])
     errors = []
+    timed_out = False
+    search_queries = build_suggest_queries(base_keyword)
 
-    url_template = "http://suggestqueries.google.com/complete/search?client=firefox&hl=ja&q={}"
-    
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64; rv:120.0) Gecko/20100101 Firefox/120.0',
-        'Accept': 'application/json, text/plain, */*',
-        'Accept-Language': 'ja,en-US;q=0.9,en;q=0.8',
-        'Accept-Encoding': 'gzip, deflate',
-        'DNT': '1',
-        'Connection': 'keep-alive',
-        'Upgrade-Insecure-Requests': '1',
-    }
-    
-    search_queries = [base_keyword] + [f"{base_keyword} {letter}" for letter in suggest_letters]
+    # キャッシュ済みのクエリは待ち時間なしでそのまま使う
+    uncached_queries = []
+    for query in search_queries:
+        cached = cache.get(query) if cache is not None else None
+        if cached is None:
+            uncached_queries.append(query)
+        else:
+            keywords.update(cached)
+    if progress_callback and len(uncached_queries) < len(search_queries):
+        progress_callback(len(search_queries) - len(uncached_queries), len(search_queries))
 
-    def fetch_suggestions(query):
+    own_executor = executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+
+    finished = False
+    pending = set()
+    try:
+        future_to_query = {
+            executor.submit(fetch_suggestions, query, session, cache, rate_limiter=rate_limiter): query
+            for query in uncached_queries
+        }
+        pending = set(future_to_query)
         try:
-            encoded_query = urllib.parse.quote_plus(query)
-            url = url_template.format(encoded_query)
-            
-            response = requests.get(url, headers=headers, timeout=10)
-            response.raise_for_status()
-            response.encoding = 'utf-8'
-            
-            suggestions = json.loads(response.text)
-            
-            query_keywords = set()
-            if len(suggestions) > 1 and suggestions[1]:
-                for suggestion in suggestions[1]:
-                    if suggestion and len(suggestion.strip()) > 0:
-                        query_keywords.add(suggestion.strip())
-            
-            return query_keywords, None
+            for future in as_completed(future_to_query, timeout=deadline):
+                pending.discard(future)
+                result_keywords, error = future.result()
+                keywords.update(result_keywords)
 
-        except requests.exceptions.RequestException as e:
-            return set(), f"リクエストエラー: {query} ({e})"
-        except json.JSONDecodeError as e:
-            return set(), f"レスポンス解析エラー: {query} ({e})"
-        except Exception as e:
-            return set(), f"不明なエラー: {query} ({e})"
+                if error:
+                    errors.append(error)
 
-    # 並列処理でリクエストを実行
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        future_to_query = {executor.submit(fetch_suggestions, query): query for query in search_queries}
-        
-        progress_bar = st.progress(0)
-        completed = 0
-        
-        for future in as_completed(future_to_query):
-            result_keywords, error = future.result()
-            keywords.update(result_keywords)
-            
-            if error:
-                errors.append(error)
-            
-            completed += 1
-            progress_bar.progress(completed / len(search_queries))
-            
-            # レート制限対策
-            time.sleep(0.05)
-    
+                if progress_callback:
+                    progress_callback(len(search_queries) - len(pending), len(search_queries))
+
+                # レート制限対策
+                if delay:
+                    time.sleep(delay)
+        except FuturesTimeoutError:
+            # 時間切れ：完了済みの結果だけを使い、残りは取り消す
+            timed_out = True
+            for future in pending:
+                if future.done() and not future.cancelled():
+                    keywords.update(future.result()[0])
+                else:
+                    future.cancel()
+                    errors.append(f"タイムアウト: {future_to_query[future]}")
+        finished = True
+    finally:
+        if not finished:
+            # 途中で中断された場合（画面操作による再実行など）は残りのリクエストを取り消す
+            for future in pending:
+                future.cancel()
+        if own_executor:
+            executor.shutdown(wait=finished and not timed_out, cancel_futures=not finished or timed_out)
+
+    return sorted(keywords), errors, timed_out
+
+def interleave_seed_queries(seeds):
+    """
+    各シードのクエリを1件ずつ順番に並べ、全シードが均等に進むようにする
+    """
+    per_seed_queries = [build_suggest_queries(seed) for seed in seeds]
+    return [
+        (seed, query)
+        for round_queries in zip(*per_seed_queries)
+        for seed, query in zip(seeds, round_queries)
+    ]
+
+def collect_bulk_suggestions(seeds, session=None, cache=None, executor=None, rate_limiter=None,
+                             max_workers=5, rate_limit=10.0, progress_callback=None):
+    """
+    複数シードのサジェストを1つのスレッドプールとリクエスト枠で取得する
+    executor / rate_limiter を渡すと、他の取得処理とスレッドプール・リクエスト枠を共有する
+    クエリは一定件数ずつ投入し、同じスレッドプールを使う他の処理を長く待たせない
+    戻り値は {シード: キーワード一覧} と エラー一覧
+    """
+    seed_keywords = {seed: set([seed]) for seed in seeds}
+    completed = {seed: 0 for seed in seeds}
+    errors = []
+    scheduled = iter(interleave_seed_queries(seeds))
+    per_seed_total = len(build_suggest_queries(seeds[0])) if seeds else 0
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+    own_rate_limiter = rate_limiter is None
+    if own_rate_limiter:
+        rate_limiter = RateLimiter(rate_limit, burst=max_workers)
+
+    def submit(count):
+        for seed, query in itertools.islice(scheduled, count):
+            in_flight[executor.submit(fetch_suggestions, query, session, cache, rate_limiter=rate_limiter)] = seed
+
+    in_flight = {}
+    finished = False
+    try:
+        submit(max_workers * 2)
+        while in_flight:
+            done, _ = futures_wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                seed = in_flight.pop(future)
+                result_keywords, error = future.result()
+                seed_keywords[seed].update(result_keywords)
+                completed[seed] += 1
+
+                if error:
+                    errors.append(error)
+
+            # 完了した件数だけ次のクエリを投入
+            submit(len(done))
+
+            if progress_callback:
+                progress_callback(completed, per_seed_total)
+        finished = True
+    finally:
+        # 途中で中断された場合（画面操作による再実行など）は残りのリクエストを待たずに取り消す
+        if not finished:
+            for future in in_flight:
+                future.cancel()
+            if own_rate_limiter:
+                rate_limiter.close()
+        if own_executor:
+            executor.shutdown(wait=finished, cancel_futures=not finished)
+
+    return {seed: sorted(keywords) for seed, keywords in seed_keywords.items()}, errors
+
+def parse_seed_file(raw_bytes, filename):
+    """
+    アップロードされたCSV/TXTからシードキーワードを読み込む（CSVは1列目を使用）
+    """
+    for encoding in ("utf-8-sig", "cp932"):
+        try:
+            text = raw_bytes.decode(encoding)
+            break
+        except UnicodeDecodeError:
+            continue
+    else:
+        raise ValueError("文字コードを判別できませんでした（UTF-8 または Shift_JIS で保存してください）")
+
+    if filename.lower().endswith(".csv"):
+        cells = [row[0] for row in csv.reader(io.StringIO(text)) if row]
+        # 見出し行はスキップ
+        if cells and cells[0].strip().lower() in ("keyword", "keywords", "seed", "キーワード", "シード"):
+            cells = cells[1:]
+    else:
+        cells = text.splitlines()
+
+    seeds = []
+    seen = set()
+    for cell in cells:
+        seed = cell.strip()
+        if seed and seed not in seen:
+            seen.add(seed)
+            seeds.append(seed)
+    return seeds
+
+def get_google_suggestions_batch(base_keyword):
+    """
+    並列処理でGoogleサジェストを効率的に取得
+    """
+    runtime = get_suggest_runtime()
+    progress_bar = st.progress(0)
+    with runtime["activity"].interactive():
+        keywords, errors, _ = collect_google_suggestions(
+            base_keyword,
+            session=runtime["session"],
+            cache=runtime["cache"],
+            executor=runtime["executor"],
+            rate_limiter=runtime["rate_limiter"],
+            progress_callback=lambda completed, total: progress_bar.progress(completed / total),
+            delay=0
+        )
     progress_bar.empty()
-    
-    if errors and len(errors) > len(search_queries) * 0.3:  # エラー率が30%を超える場合のみ表示
+
+    search_count = len(SUGGEST_LETTERS) + 1
+    if errors and len(errors) > search_count * 0.3:  # エラー率が30%を超える場合のみ表示
         with st.expander("⚠️ 取得中にエラーが発生しました（詳細を見る）"):
             st.warning("一部のキーワードが取得できませんでした。Googleによる一時的なアクセス制限の可能性があります。")
             for error in errors[:5]:
                 st.text(error)
 
-    return sorted(list(keywords))
+    return keywords
+
+# --- キーワードの種別分類 ---
+TREND_WORDS = ["最新", "今", "現在", "話題", "速報"]
+QUESTION_WORDS = ["とは", "方法", "やり方", "なぜ"]
+
+def classify_keyword(keyword):
+    """
+    キーワードを「トレンド系」「疑問系」「一般」のいずれかに分類する
+    """
+    if any(word in keyword for word in TREND_WORDS):
+        return "トレンド系"
+    if any(word in keyword for word in QUESTION_WORDS):
+        return "疑問系"
+    return "一般"
+
+# --- トピック分類：共起行列によるキーワードのテーマ分け ---
+# 文字種（漢字・カタカナ・ひらがな・英数字）の境界で区切る簡易分かち書き
+TOKEN_PATTERN = re.compile(
+    # 漢字（送り仮名を挟んで続く漢字も1語として扱う：始め方、使い方、やり方 など）
+    r"[\u3041-\u309f]{0,3}[\u4e00-\u9fff\u3005\u3006]+(?:[\u3041-\u309f]{1,2}[\u4e00-\u9fff\u3005\u3006]+)*"
+    r"|[\u30a1-\u30fa\u30fc]+"        # カタカナ
+    r"|[\u3041-\u309f]+"              # ひらがな
+    r"|[a-z0-9]+"                     # 英数字
+)
+
+# テーマの手がかりにならない助詞などのトークン
+STOP_TOKENS = {"の", "を", "に", "は", "が", "と", "で", "も", "や", "へ", "から", "まで", "より", "など"}
+
+def tokenize_keyword(keyword):
+    """
+    キーワードをトークンに分割する（空白区切り + 文字種境界による簡易分かち書き）
+    """
+    normalized = unicodedata.normalize("NFKC", keyword).lower()
+    tokens = []
+    for chunk in normalized.split():
+        for token in TOKEN_PATTERN.findall(chunk):
+            if token in STOP_TOKENS:
+                continue
+            # 1文字のひらがなは助詞・語尾であることが多いため除外
+            if len(token) == 1 and "\u3041" <= token <= "\u309f":
+                continue
+            tokens.append(token)
+    return tokens
+
+def is_theme_label_token(token):
+    """
+    テーマ名に使えるトークンか判定する（1文字の漢字や「ない」などの短いひらがなは除外）
+    """
+    if len(token) == 1:
+        return False
+    if len(token) <= 2 and all("\u3041" <= ch <= "\u309f" for ch in token):
+        return False
+    return True
+
+def cluster_keywords(keywords, base_keyword="", min_df=2, max_df_ratio=0.5, similarity_threshold=0.3):
+    """
+    キーワード×トークンの疎行列からトークン共起グラフを作り、
+    閾値以上の類似度で連結成分に分けてテーマ（クラスタ）を求める
+
+    キーワード同士ではなくトークン同士の共起を計算するため、
+    10万件規模のキーワードでも疎行列のまま高速に処理できる
+    """
+    n_keywords = len(keywords)
+    if n_keywords == 0:
+        return []
+
+    # メインキーワードのトークンは全件に含まれるためテーマ分けには使わない
+    seed_tokens = set(tokenize_keyword(base_keyword))
+
+    vocabulary = {}
+    rows, cols = [], []
+    for i, kw in enumerate(keywords):
+        for token in set(tokenize_keyword(kw)):
+            if token in seed_tokens:
+                continue
+            rows.append(i)
+            cols.append(vocabulary.setdefault(token, len(vocabulary)))
+
+    token_names = np.array(list(vocabulary), dtype=object)
+    matrix = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+        shape=(n_keywords, len(vocabulary))
+    )
+
+    # 出現頻度が低すぎる／高すぎるトークンを除外
+    doc_freq = np.asarray(matrix.sum(axis=0)).ravel()
+    keep = (doc_freq >= min_df) & (doc_freq <= max(min_df, max_df_ratio * n_keywords))
+    matrix = matrix.tocsc()[:, keep].tocsr()
+    token_names = token_names[keep]
+    doc_freq = doc_freq[keep]
+    n_tokens = len(token_names)
+
+    labels = np.full(n_keywords, -1)
+    centrality = np.zeros(n_keywords)
+    theme_tokens = {}
+
+    if n_tokens > 0:
+        # トークン共起行列（コサイン類似度）を閾値で間引いて連結成分を求める
+        cooccurrence = (matrix.T @ matrix).tocoo()
+        inv_norm = 1.0 / np.sqrt(doc_freq)
+        similarity = cooccurrence.data * inv_norm[cooccurrence.row] * inv_norm[cooccurrence.col]
+        edge = (cooccurrence.row != cooccurrence.col) & (similarity >= similarity_threshold)
+        adjacency = sparse.coo_matrix(
+            (similarity[edge], (cooccurrence.row[edge], cooccurrence.col[edge])),
+            shape=(n_tokens, n_tokens)
+        )
+        n_topics, token_labels = connected_components(adjacency, directed=False)
+
+        # 各キーワードは含まれるトークンのIDF合計が最大のテーマに割り当てる
+        idf = np.log(n_keywords / doc_freq)
+        token_index = np.arange(n_tokens)
+        membership_idf = sparse.csr_matrix((idf, (token_index, token_labels)), shape=(n_tokens, n_topics))
+        membership_df = sparse.csr_matrix((doc_freq, (token_index, token_labels)), shape=(n_tokens, n_topics))
+        topic_scores = matrix @ membership_idf
+
+        assigned = np.diff(topic_scores.indptr) > 0
+        assigned_rows = np.flatnonzero(assigned)
+        labels[assigned] = np.asarray(topic_scores[assigned_rows].argmax(axis=1)).ravel()
+
+        # 代表キーワード選定用：テーマ内でよく使われるトークンを多く含むほど中心的
+        centrality_scores = (matrix @ membership_df).tocsr()
+        centrality[assigned_rows] = np.asarray(
+            centrality_scores[assigned_rows, labels[assigned_rows]]
+        ).ravel()
+
+        # テーマ名：テーマ内で出現頻度の高いトークン上位3件
+        # テーマ名に向かないトークンしかない場合は最頻出のトークンを使う
+        token_order = np.lexsort((-doc_freq, token_labels))
+        fallback_tokens = {}
+        for t in token_order:
+            fallback_tokens.setdefault(token_labels[t], [token_names[t]])
+            names = theme_tokens.setdefault(token_labels[t], [])
+            if len(names) < 3 and is_theme_label_token(token_names[t]):
+                names.append(token_names[t])
+        for label, names in theme_tokens.items():
+            if not names:
+                names.extend(fallback_tokens[label])
+
+    # テーマごとにまとめ、中心性が高く短いキーワードを先頭に並べる
+    keyword_array = np.array(keywords, dtype=object)
+    lengths = np.fromiter((len(kw) for kw in keywords), dtype=np.int64, count=n_keywords)
+    order = np.lexsort((lengths, -centrality, labels))
+    sorted_labels = labels[order]
+    boundaries = np.flatnonzero(np.diff(sorted_labels)) + 1
+
+    clusters = []
+    other = None
+    for group in np.split(order, boundaries):
+        label = labels[group[0]]
+        members = keyword_array[group].tolist()
+        if label < 0:
+            other = {"theme": "その他", "representative": members[0], "size": len(members), "keywords": members}
+            continue
+        clusters.append({
+            "theme": " / ".join(theme_tokens[label]),
+            "representative": members[0],
+            "size": len(members),
+            "keywords": members,
+        })
+
+    clusters.sort(key=lambda c: -c["size"])
+    if other:
+        clusters.append(other)
+    return clusters
+
+# --- プロファイリング機能 ---
+PROFILE_ENV_VAR = "KEYWORD_GENIE_PROFILE"
+
+def is_profiling_requested():
+    """
+    CLI引数（streamlit run app.py -- --profile）または環境変数でプロファイリングが指定されているか判定
+    """
+    if "--profile" in sys.argv:
+        return True
+    return os.environ.get(PROFILE_ENV_VAR, "").lower() in ("1", "true", "yes", "on")
+
+class PipelineProfiler:
+    """
+    分析処理全体をcProfileで計測し、処理段階ごとの経過時間とメモリ確保のピークを記録する
+    無効時は何もしないため、計測箇所を常に stage() で囲んでおける
+    """
+
+    def __init__(self, enabled, lock=None):
+        self.enabled = enabled
+        self.skipped = False
+        self.stages = []
+        self.total_time = 0.0
+        self._profile = cProfile.Profile() if enabled else None
+        self._lock = lock
+        self._started_at = None
+        self._owns_tracemalloc = False
+
+    def start(self):
+        """
+        計測を開始する（他のセッションが計測中の場合は今回の計測を見送る）
+        """
+        if not self.enabled:
+            return
+        if self._lock is not None and not self._lock.acquire(blocking=False):
+            self._skip()
+            return
+
+        try:
+            # Python 3.12以降はプロファイラを同時に1つしか有効にできない
+            self._profile.enable()
+        except ValueError:
+            self._release_lock()
+            self._skip()
+            return
+
+        # 事前にメモリ計測が有効な場合（PYTHONTRACEMALLOC等）は停止しない
+        self._owns_tracemalloc = not tracemalloc.is_tracing()
+        if self._owns_tracemalloc:
+            tracemalloc.start()
+        self._started_at = time.perf_counter()
+
+    def stop(self):
+        if not self.enabled or self._started_at is None:
+            return
+        self._profile.disable()
+        self.total_time = time.perf_counter() - self._started_at
+        self._started_at = None
+        if self._owns_tracemalloc:
+            tracemalloc.stop()
+            self._owns_tracemalloc = False
+        self._release_lock()
+
+    def _skip(self):
+        self.enabled = False
+        self.skipped = True
+
+    def _release_lock(self):
+        if self._lock is not None:
+            self._lock.release()
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+
+        tracemalloc.reset_peak()
+        baseline, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            self.stages.append({
+                "処理段階": name,
+                "経過時間(秒)": round(elapsed, 4),
+                "メモリピーク(MB)": round(max(peak - baseline, 0) / 1024 / 1024, 3),
+            })
+
+    def hot_functions(self, sort_by="tottime", limit=30):
+        """
+        処理時間の長い関数の一覧をDataFrameで返す
+        """
+        stats = pstats.Stats(self._profile)
+        rows = []
+        for (filename, lineno, func_name), (_, ncalls, tottime, cumtime, _) in stats.stats.items():
+            rows.append({
+                "関数": f"{func_name} ({os.path.basename(filename)}:{lineno})",
+                "呼び出し回数": ncalls,
+                "自己時間(秒)": round(tottime, 4),
+                "累積時間(秒)": round(cumtime, 4),
+            })
+        column = "自己時間(秒)" if sort_by == "tottime" else "累積時間(秒)"
+        hot_df = pd.DataFrame(rows, columns=["関数", "呼び出し回数", "自己時間(秒)", "累積時間(秒)"])
+        return hot_df.sort_values(column, ascending=False).head(limit).reset_index(drop=True)
+
+    def raw_profile(self):
+        """
+        pstats / snakeviz などで読み込める形式（.prof）のバイト列を返す
+        """
+        self._profile.create_stats()
+        return marshal.dumps(self._profile.stats)
+
+@st.cache_resource
+def get_profiling_lock():
+    """
+    プロファイリングを同時に1セッションだけに制限するためのロック（プロセスごとに1つ）
+    """
+    return threading.Lock()
+
+def render_profile_report(profiler, base_keyword):
+    """
+    プロファイル結果（処理段階ごとの内訳・ホット関数・生データ）を表示する
+    """
+    st.subheader("⏱️ プロファイル結果")
+    st.caption(f"分析全体の経過時間: **{profiler.total_time:.2f}秒**")
+
+    st.markdown("**処理段階ごとの内訳**")
+    st.dataframe(pd.DataFrame(profiler.stages), use_container_width=True)
+
+    st.markdown("**処理時間の長い関数**")
+    tottime_tab, cumtime_tab = st.tabs(["自己時間順", "累積時間順"])
+    with tottime_tab:
+        st.dataframe(profiler.hot_functions("tottime"), use_container_width=True)
+    with cumtime_tab:
+        st.dataframe(profiler.hot_functions("cumtime"), use_container_width=True)
+    st.caption("💡 関数の計測は画面処理のスレッドが対象です。並列リクエストの待ち時間は「Googleサジェスト取得」の経過時間に含まれます")
+
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    st.download_button(
+        label="📥 プロファイル生データ（.prof）をダウンロード",
+        data=profiler.raw_profile(),
+        file_name=f"{base_keyword}_profile_{timestamp}.prof",
+        mime="application/octet-stream",
+        help="python -m pstats や snakeviz で詳細を分析できます"
+    )
+
+# --- バックグラウンド先読み：トレンド・追跡キーワードのキャッシュを温める ---
+PREFETCH_ENV_VAR = "KEYWORD_GENIE_PREFETCH"
+PREFETCH_THREAD_NAME = "suggest-prefetch"
+TRACKED_SEEDS_ENV_VAR = "KEYWORD_GENIE_TRACKED_SEEDS"
+TRACKED_SEEDS_FILE_ENV_VAR = "KEYWORD_GENIE_TRACKED_SEEDS_FILE"
+
+class ActivityTracker:
+    """
+    画面・APIからの取得処理の実行状況を記録し、先読みが譲るべきかを判定する
+    """
+
+    def __init__(self, idle_seconds=10):
+        self.idle_seconds = idle_seconds
+        self._active = 0
+        self._last_active = float("-inf")
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def interactive(self):
+        with self._lock:
+            self._active += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._last_active = time.monotonic()
+
+    def is_busy(self):
+        with self._lock:
+            return self._active > 0 or time.monotonic() - self._last_active < self.idle_seconds
+
+def is_prefetch_enabled():
+    """
+    環境変数 KEYWORD_GENIE_PREFETCH=0 で先読みを無効化できる
+    """
+    return os.environ.get(PREFETCH_ENV_VAR, "1").lower() not in ("0", "false", "no", "off")
+
+def load_tracked_seeds():
+    """
+    管理者が設定した追跡キーワードを読み込む
+    環境変数（カンマ区切り）と、tracked_seeds.txt（または指定ファイル）の両方を使う
+    """
+    seeds = [seed.strip() for seed in os.environ.get(TRACKED_SEEDS_ENV_VAR, "").split(",") if seed.strip()]
+
+    seeds_file = os.environ.get(
+        TRACKED_SEEDS_FILE_ENV_VAR,
+        os.path.join(os.path.dirname(os.path.abspath(__file__)), "tracked_seeds.txt")
+    )
+    if os.path.exists(seeds_file):
+        try:
+            with open(seeds_file, "rb") as f:
+                seeds += parse_seed_file(f.read(), seeds_file)
+        except (OSError, ValueError):
+            pass
+
+    return list(dict.fromkeys(seeds))
+
+class SuggestPrefetcher:
+    """
+    トレンドキーワードと追跡キーワードのサジェストを定期的に先読みしてキャッシュに入れる
+    低いリクエスト枠で1件ずつ取得し、利用者の取得処理が動いている間は待機する
+    """
+
+    def __init__(self, session, cache, activity, interval=1800, rate_limit=2.0):
+        self.session = session
+        self.cache = cache
+        self.activity = activity
+        self.interval = interval
+        self.rate_limiter = RateLimiter(rate_limit)
+        self.last_run = None
+        self.last_fetched = 0
+        self.last_error = None
+        self.last_error_at = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+
+        # キャッシュの再作成などで以前の先読みスレッドが残っていれば止め、プロセス内で1つだけ動かす
+        for thread in threading.enumerate():
+            previous = getattr(thread, "prefetcher", None)
+            if thread.name == PREFETCH_THREAD_NAME and previous is not None and previous is not self:
+                previous.stop()
+
+        self._thread = threading.Thread(target=self._run, name=PREFETCH_THREAD_NAME, daemon=True)
+        self._thread.prefetcher = self
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self.rate_limiter.close()
+
+    def seeds(self):
+        trending_keywords, _ = get_google_trends_data(notify=False)
+        return list(dict.fromkeys(trending_keywords + load_tracked_seeds()))
+
+    def prefetch_once(self):
+        fetched = 0
+        failed = 0
+        last_error = None
+        for seed in self.seeds():
+            for query in build_suggest_queries(seed):
+                if self._stop.is_set():
+                    return fetched
+                if self.cache.get(query) is not None:
+                    continue
+
+                # 利用者の取得処理を優先する
+                while self.activity.is_busy():
+                    if self._stop.wait(1.0):
+                        return fetched
+
+                _, error = fetch_suggestions(query, self.session, self.cache, rate_limiter=self.rate_limiter)
+                if error:
+                    failed += 1
+                    last_error = error
+                else:
+                    fetched += 1
+
+        self.last_run = datetime.now()
+        self.last_fetched = fetched
+        if failed:
+            logger.warning("先読みで%d件のリクエストが失敗しました（最後のエラー: %s）", failed, last_error)
+            self._record_error(f"{failed}件失敗（{last_error}）")
+        else:
+            self.last_error = None
+        return fetched
+
+    def _record_error(self, message):
+        self.last_error = message
+        self.last_error_at = datetime.now()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.prefetch_once()
+            except Exception as e:
+                # 先読みの失敗は利用者の操作に影響させず、ログと画面の状態表示で知らせる
+                logger.exception("バックグラウンド先読みに失敗しました")
+                self._record_error(f"{type(e).__name__}: {e}")
+            self._stop.wait(self.interval)
+
+@st.cache_resource
+def get_suggest_runtime():
+    """
+    全セッションで共有するHTTPセッション・キャッシュ・先読みスレッドを作成する（プロセスごとに1つ）
+    サジェスト取得は単発・一括を問わず、共有のスレッドプールとリクエスト枠で実行する
+    """
+    max_workers = int(os.environ.get("KEYWORD_GENIE_FETCH_WORKERS", 5))
+    session = create_http_session(pool_size=max_workers)
+    cache = SuggestCache(ttl=int(os.environ.get("KEYWORD_GENIE_CACHE_TTL", 3600)))
+    activity = ActivityTracker()
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="suggest")
+    rate_limiter = RateLimiter(float(os.environ.get("KEYWORD_GENIE_FETCH_RATE", 10.0)), burst=max_workers)
+
+    prefetcher = None
+    if is_prefetch_enabled():
+        prefetcher = SuggestPrefetcher(
+            session,
+            cache,
+            activity,
+            interval=int(os.environ.get("KEYWORD_GENIE_PREFETCH_INTERVAL", 1800)),
+            rate_limit=float(os.environ.get("KEYWORD_GENIE_PREFETCH_RATE", 2.0))
+        )
+        prefetcher.start()
+
+    return {
+        "session": session,
+        "cache": cache,
+        "activity": activity,
+        "executor": executor,
+        "rate_limiter": rate_limiter,
+        "max_workers": max_workers,
+        "prefetcher": prefetcher,
+    }
+
+# --- 結果表示：サーバー側でのソート・ページング ---
+RESULTS_PAGE_SIZES = [50, 100, 200, 500]
+KEYWORD_TYPES = ["一般", "疑問系", "トレンド系"]
+
+def build_keyword_frame(keywords, seeds=None):
+    """
+    表示・出力用のDataFrameを作成する（文字列の列はArrow形式で保持し、メモリとコピーを抑える）
+    """
+    df = pd.DataFrame({"キーワード": pd.Series(keywords, dtype="string[pyarrow]")})
+    if seeds is not None:
+        df.insert(0, "シード", pd.Series(seeds, dtype="string[pyarrow]"))
+    df["文字数"] = df["キーワード"].str.len().astype("int32")
+    df["種別"] = df["キーワード"].map(classify_keyword).astype("string[pyarrow]")
+    return df
+
+class ResultsView:
+    """
+    大量の結果をサーバー側でソート・絞り込みし、表示するページ分だけを切り出す
+    列ごとの並び順（ソート順列）と絞り込み結果は一度計算したら使い回す
+    """
+
+    MAX_CACHED_FILTERS = 16
+
+    def __init__(self, df):
+        self.df = df
+        self._permutations = {}
+        self._filtered = {}
+
+    def _arrow_values(self, column):
+        values = self.df[column]
+        if values.dtype == "string[pyarrow]":
+            return pa.array(values.array)
+        return pa.array(values.to_numpy())
+
+    def permutation(self, column, descending=False):
+        key = (column, descending)
+        if key not in self._permutations:
+            if not descending:
+                order = pc.sort_indices(self._arrow_values(column)).to_numpy()
+            else:
+                # 降順でも同じ値の行は昇順時と同じ順序に並べる（単純な反転だと同値の並びが逆になる）
+                ascending = self.permutation(column)
+                position = np.empty_like(ascending)
+                position[ascending] = np.arange(len(ascending))
+                ranks = pc.rank(self._arrow_values(column), sort_keys="ascending", tiebreaker="dense").to_numpy()
+                order = np.lexsort((position, -ranks.astype(np.int64)))
+            self._permutations[key] = order
+        return self._permutations[key]
+
+    def rows(self, sort_column, descending, keyword_type, min_chars, max_chars):
+        """
+        条件に合う行番号を並び順どおりに返す（計算済みの条件ならページ移動・条件の切り替え時に再計算しない）
+        """
+        key = (sort_column, descending, keyword_type, min_chars, max_chars)
+        if key not in self._filtered:
+            order = self.permutation(sort_column, descending)
+
+            lengths = self.df["文字数"].to_numpy()
+            mask = (lengths >= min_chars) & (lengths <= max_chars)
+            if keyword_type != "全て":
+                mask &= (self.df["種別"] == keyword_type).to_numpy(dtype=bool)
+
+            if len(self._filtered) >= self.MAX_CACHED_FILTERS:
+                # 最も古い条件から削除
+                del self._filtered[next(iter(self._filtered))]
+            self._filtered[key] = order[mask[order]]
+        return self._filtered[key]
+
+    def page(self, rows, page, per_page):
+        start = (page - 1) * per_page
+        return self.df.iloc[rows[start:start + per_page]]
+
+@st.fragment
+def render_results_view(view, key):
+    """
+    ページ切り替え・ソート・絞り込みの操作で、この表だけを再描画する
+    """
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        filter_type = st.selectbox("種別フィルタ", ["全て"] + KEYWORD_TYPES, key=f"{key}_type")
+    with col2:
+        min_chars = st.number_input("最小文字数", min_value=1, value=1, key=f"{key}_min_chars")
+    with col3:
+        max_chars = st.number_input("最大文字数", min_value=1, value=50, key=f"{key}_max_chars")
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        sort_column = st.selectbox("並び替え", list(view.df.columns), key=f"{key}_sort")
+    with col2:
+        descending = st.toggle("降順", value=False, key=f"{key}_desc")
+    with col3:
+        per_page = st.selectbox("1ページの表示件数", RESULTS_PAGE_SIZES, index=1, key=f"{key}_per_page")
+
+    rows = view.rows(sort_column, descending, filter_type, min_chars, max_chars)
+    page_count = max(1, -(-len(rows) // per_page))
+    page = st.number_input(
+        f"ページ（全{page_count}ページ）",
+        min_value=1,
+        max_value=page_count,
+        value=1,
+        key=f"{key}_page"
+    )
+
+    st.dataframe(
+        view.page(rows, min(page, page_count), per_page),
+        height=400,
+        use_container_width=True,
+        column_config={
+            "キーワード": st.column_config.TextColumn("キーワード", width="large"),
+            "文字数": st.column_config.NumberColumn("文字数", width="small"),
+            "種別": st.column_config.TextColumn("種別", width="medium")
+        }
+    )
+    st.caption(f"該当 {len(rows):,}件 / 全 {len(view.df):,}件")
+
+# --- HTTP APIサーバー（他ツールからの利用向け） ---
+API_DEFAULT_PER_PAGE = 100
+API_MAX_PER_PAGE = 1000
+API_DEFAULT_TIMEOUT = 30
+API_MAX_TIMEOUT = 120
+API_MAX_BODY_BYTES = 1024 * 1024
+
+class KeywordAPIError(Exception):
+    """
+    APIリクエストの内容が不正な場合のエラー
+    """
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+class KeywordAPIService:
+    """
+    HTTPセッション・スレッドプール・キャッシュを全リクエストで共有するAPI処理本体
+    """
+
+    def __init__(self, max_workers=10, cache_ttl=3600, rate_limit=10.0):
+        self.session = create_http_session(pool_size=max_workers)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="suggest")
+        self.cache = SuggestCache(ttl=cache_ttl)
+        self.activity = ActivityTracker()
+        # 全呼び出し元で共有するリクエスト枠（Googleへの送信ペースを一定に保つ）
+        self.rate_limiter = RateLimiter(rate_limit, burst=max_workers)
+
+    def suggest(self, params):
+        keyword = self._require_keyword(params)
+        with self.activity.interactive():
+            keywords, errors, timed_out = collect_google_suggestions(
+                keyword,
+                session=self.session,
+                cache=self.cache,
+                executor=self.executor,
+                deadline=self._timeout(params),
+                delay=0,
+                rate_limiter=self.rate_limiter
+            )
+        return self._paginate(keywords, params, query=keyword, errors=errors, partial=timed_out)
+
+    def realtime(self, params):
+        keyword = self._require_keyword(params)
+        return self._paginate(get_yahoo_realtime_alternative(keyword), params, query=keyword)
+
+    def trends(self, params):
+        cached = self.cache.get(("trends",))
+        partial = False
+        if cached is None:
+            # pytrends の応答待ちもリクエスト単位のタイムアウトに従う
+            future = self.executor.submit(get_google_trends_data, notify=False)
+            try:
+                cached = future.result(timeout=self._timeout(params))
+                self.cache.set(("trends",), cached)
+            except FuturesTimeoutError:
+                cached = (get_trending_keywords_fallback(), False)
+                partial = True
+        trending_keywords, is_real_trend = cached
+        return self._paginate(
+            trending_keywords,
+            params,
+            source="google_trends" if is_real_trend else "seasonal",
+            partial=partial
+        )
+
+    def classify(self, params, body=None):
+        if body and body.get("keywords") is not None:
+            keywords = body["keywords"]
+            if not isinstance(keywords, list) or not all(isinstance(kw, str) for kw in keywords):
+                raise KeywordAPIError(400, "keywords は文字列の配列で指定してください")
+            result = self._paginate(keywords, params)
+        else:
+            result = self.suggest(params)
+
+        result["items"] = [
+            {"keyword": kw, "length": len(kw), "type": classify_keyword(kw)}
+            for kw in result["items"]
+        ]
+        return result
+
+    def _require_keyword(self, params):
+        keyword = params.get("q", [""])[0].strip()
+        if not keyword:
+            raise KeywordAPIError(400, "パラメータ q を指定してください")
+        return keyword
+
+    def _int_param(self, params, name, default, minimum, maximum):
+        try:
+            value = int(params.get(name, [default])[0])
+        except ValueError:
+            raise KeywordAPIError(400, f"パラメータ {name} は整数で指定してください")
+        return min(max(value, minimum), maximum)
+
+    def _timeout(self, params):
+        return self._int_param(params, "timeout", API_DEFAULT_TIMEOUT, 1, API_MAX_TIMEOUT)
+
+    def _paginate(self, items, params, **extra):
+        page = self._int_param(params, "page", 1, 1, 10 ** 9)
+        per_page = self._int_param(params, "per_page", API_DEFAULT_PER_PAGE, 1, API_MAX_PER_PAGE)
+        start = (page - 1) * per_page
+        return {
+            **extra,
+            "total": len(items),
+            "page": page,
+            "per_page": per_page,
+            "has_next": start + per_page < len(items),
+            "items": list(items[start:start + per_page]),
+        }
+
+class KeywordAPIHandler(BaseHTTPRequestHandler):
+    """
+    /api/suggest, /api/realtime, /api/trends, /api/classify を提供するリクエストハンドラ
+    """
+
+    service = None
+    routes = {
+        "/api/suggest": "suggest",
+        "/api/realtime": "realtime",
+        "/api/trends": "trends",
+        "/api/classify": "classify",
+    }
+
+    def do_GET(self):
+        self._dispatch()
+
+    def do_POST(self):
+        self._dispatch(read_body=True)
+
+    def _dispatch(self, read_body=False):
+        parsed = urllib.parse.urlparse(self.path)
+        params = urllib.parse.parse_qs(parsed.query)
+
+        try:
+            if parsed.path == "/healthz":
+                self._send_json(200, {"status": "ok"})
+                return
+
+            handler_name = self.routes.get(parsed.path)
+            if handler_name is None:
+                raise KeywordAPIError(404, f"存在しないエンドポイントです: {parsed.path}")
+
+            if read_body:
+                if handler_name != "classify":
+                    raise KeywordAPIError(405, "POSTは /api/classify のみ対応しています")
+                try:
+                    length = int(self.headers.get("Content-Length") or 0)
+                except ValueError:
+                    raise KeywordAPIError(400, "Content-Length ヘッダーが不正です")
+                if length < 0:
+                    raise KeywordAPIError(400, "Content-Length ヘッダーが不正です")
+                if length > API_MAX_BODY_BYTES:
+                    raise KeywordAPIError(413, f"リクエスト本文は{API_MAX_BODY_BYTES}バイト以下にしてください")
+                try:
+                    body = json.loads(self.rfile.read(length) or b"{}")
+                except ValueError as e:
+                    # JSONの構文エラーに加え、UTF-8として読めない本文もここで扱う
+                    raise KeywordAPIError(400, f"JSONの解析に失敗しました ({e})")
+                if not isinstance(body, dict):
+                    raise KeywordAPIError(400, "リクエスト本文はJSONオブジェクトで指定してください")
+                self._send_json(200, self.service.classify(params, body))
+            else:
+                self._send_json(200, getattr(self.service, handler_name)(params))
+
+        except KeywordAPIError as e:
+            self._send_json(e.status, {"error": str(e)})
+        except Exception as e:
+            self._send_json(500, {"error": f"内部エラー: {e}"})
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+def create_api_server(host="127.0.0.1", port=8765, max_workers=10, cache_ttl=3600, rate_limit=10.0):
+    """
+    共有のAPIサービスを持つマルチスレッドHTTPサーバーを作成する
+    """
+    handler = type("BoundKeywordAPIHandler", (KeywordAPIHandler,), {
+        "service": KeywordAPIService(max_workers=max_workers, cache_ttl=cache_ttl, rate_limit=rate_limit)
+    })
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server
+
+def run_api_server(argv):
+    """
+    コマンドライン引数を解釈してAPIサーバーを起動する
+    """
+    parser = argparse.ArgumentParser(description="SEOキーワード発想支援ツール HTTP APIサーバー")
+    parser.add_argument("--serve", action="store_true")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=10, help="サジェスト取得の同時接続数")
+    parser.add_argument("--cache-ttl", type=int, default=3600, help="キャッシュの有効期間（秒）")
+    parser.add_argument("--rate", type=float, default=10.0, help="全呼び出し元合計のリクエスト上限（件/秒）")
+    parser.add_argument("--prefetch-interval", type=int, default=1800, help="先読みの実行間隔（秒）")
+    parser.add_argument("--prefetch-rate", type=float, default=2.0, help="先読みのリクエスト上限（件/秒）")
+    parser.add_argument("--no-prefetch", action="store_true", help="バックグラウンド先読みを無効化")
+    args, _ = parser.parse_known_args(argv)
+
+    server = create_api_server(args.host, args.port, args.workers, args.cache_ttl, args.rate)
+    if not args.no_prefetch and is_prefetch_enabled():
+        service = server.RequestHandlerClass.service
+        SuggestPrefetcher(
+            service.session,
+            service.cache,
+            service.activity,
+            interval=args.prefetch_interval,
+            rate_limit=args.prefetch_rate
+        ).start()
+    print(f"🚀 APIサーバーを起動しました: http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+if SERVER_MODE:
+    run_api_server(sys.argv[1:])
+    sys.exit(0)
 
 # --- メイン UI ---
+suggest_runtime = get_suggest_runtime()
+
 st.title("🚀 SEOキーワード発想支援ツール Pro")
 st.markdown("**Googleサジェスト + トレンド分析 + リアルタイムキーワード生成**")
 
@@ -201,10 +1325,33 @@ with st.sidebar:
     
     enable_trends = st.checkbox("🔥 Googleトレンド機能", value=True, help="人気上昇中のキーワードを表示")
     enable_realtime = st.checkbox("⚡ リアルタイムキーワード生成", value=True, help="時事性の高いキーワードを生成")
+
+    prefetcher = suggest_runtime["prefetcher"]
+    if prefetcher is None:
+        st.caption("🔄 バックグラウンド先読み: 無効")
+    elif prefetcher.last_run is None:
+        st.caption("🔄 バックグラウンド先読み: 実行中…")
+    else:
+        st.caption(f"🔄 バックグラウンド先読み: {prefetcher.last_run.strftime('%H:%M')} 完了（{prefetcher.last_fetched}件取得）")
+    if prefetcher is not None and prefetcher.last_error:
+        st.caption(f"⚠️ 先読みエラー（{prefetcher.last_error_at.strftime('%H:%M')}）: {prefetcher.last_error}")
     
     st.header("📊 分析オプション")
     min_keyword_length = st.slider("最小キーワード長", 1, 10, 2, help="この文字数未満のキーワードを除外")
-    max_results = st.slider("最大表示件数", 50, 500, 200, help="表示するキーワードの上限")
+    max_results = st.select_slider(
+        "最大表示件数",
+        options=[50, 100, 200, 500, 1000, 5000, 10000, 50000, 0],
+        value=200,
+        format_func=lambda v: "上限なし" if v == 0 else f"{v:,}件",
+        help="表示するキーワードの上限"
+    )
+
+    st.header("🛠️ 開発者オプション")
+    enable_profiling = st.checkbox(
+        "⏱️ プロファイリングモード",
+        value=is_profiling_requested(),
+        help=f"分析処理の時間・メモリ使用量を計測します（`--profile` 引数または環境変数 {PROFILE_ENV_VAR}=1 でも有効化）"
+    )
 
 # ガイドセクション
 guide_tab1, guide_tab2 = st.tabs(["📖 使い方ガイド", "🎯 SEOキーワード攻略マニュアル"])
@@ -221,6 +1368,8 @@ with guide_tab1:
     - **🔥 Googleトレンド**: 現在人気上昇中のキーワードを表示
     - **⚡ リアルタイム生成**: 時事性の高いキーワードバリエーションを自動生成
     - **🚀 並列処理**: より高速なキーワード取得
+    - **🧩 トピック分類**: キーワードをテーマごとに自動でグループ化
+    - **📂 一括分析**: CSV/TXTでアップロードした複数キーワードをまとめて取得
     
     ### 活用のコツ
     - 複数の機能を組み合わせて包括的な分析を実行
@@ -450,7 +1599,8 @@ with col1:
     keyword_input = st.text_input(
         "🎯 メインキーワードを入力",
         placeholder="例：副業 ブログ",
-        help="ここに入力したキーワードを元に、関連キーワードを大量に取得します。"
+        help="ここに入力したキーワードを元に、関連キーワードを大量に取得します。",
+        key="keyword_input"
     )
 
 with col2:
@@ -458,7 +1608,27 @@ with col2:
     st.write("")  # スペース調整
     analyze_button = st.button("🔍 分析開始", type="primary", use_container_width=True)
 
+# 複数キーワードの一括分析
+with st.expander("📂 複数キーワードを一括分析（CSV/TXTアップロード）"):
+    seed_file = st.file_uploader(
+        "シードキーワードのファイル",
+        type=["csv", "txt"],
+        help="CSVは1列目、TXTは1行に1キーワードを記載してください"
+    )
+    st.caption(
+        f"💡 取得は全利用者で共有の同時接続数 {suggest_runtime['max_workers']}・"
+        f"リクエスト上限 {suggest_runtime['rate_limiter'].rate:g}件/秒 で実行されます"
+        "（環境変数 KEYWORD_GENIE_FETCH_WORKERS / KEYWORD_GENIE_FETCH_RATE で変更）"
+    )
+    bulk_button = st.button("📂 一括分析開始", disabled=seed_file is None, use_container_width=True)
+
 # Googleトレンド表示（サイドバーで有効化されている場合）
+def select_trend_keyword(trend):
+    """
+    トレンドキーワードのボタンが押されたら、メインキーワードの入力欄に設定する
+    """
+    st.session_state.keyword_input = trend
+
 if enable_trends:
     with st.container():
         st.subheader("🔥 現在のトレンドキーワード")
@@ -468,7 +1638,11 @@ if enable_trends:
         with trends_col1:
             if st.button("🔄 トレンドを取得", key="get_trends"):
                 with st.spinner("トレンドキーワードを取得中..."):
-                    trending_keywords, is_real_trend = get_google_trends_data()
+                    st.session_state.trends_result = get_google_trends_data()
+            
+            # 取得済みのトレンドは再実行後もボタンとして表示し続ける
+            if "trends_result" in st.session_state:
+                trending_keywords, is_real_trend = st.session_state.trends_result
                 
                 if trending_keywords:
                     if is_real_trend:
@@ -481,28 +1655,30 @@ if enable_trends:
                     trend_cols = st.columns(4)
                     for i, trend in enumerate(trending_keywords):
                         with trend_cols[i % 4]:
-                            if st.button(f"📈 {trend}", key=f"trend_{i}", help="クリックでメインキーワードに設定"):
-                                st.session_state.trend_selected = trend
-                                st.rerun()
+                            st.button(
+                                f"📈 {trend}",
+                                key=f"trend_{i}",
+                                help="クリックでメインキーワードに設定",
+                                on_click=select_trend_keyword,
+                                args=(trend,)
+                            )
                 else:
                     st.info("トレンドデータを取得できませんでした")
         
         with trends_col2:
             st.info("💡 **Tip**: トレンドキーワードをクリックすると、メインキーワードとして設定されます")
 
-# トレンドキーワードが選択された場合の処理
-if 'trend_selected' in st.session_state:
-    keyword_input = st.session_state.trend_selected
-    del st.session_state.trend_selected
-
 # メイン分析処理
-if analyze_button and keyword_input:
+def run_keyword_analysis(keyword_input, profiler):
+    """
+    キーワードの取得から結果表示・出力までの分析処理本体
+    """
     all_keywords = set()
     
     # 1. Googleサジェスト取得
     st.subheader("📋 分析結果")
     
-    with st.spinner("🔍 Googleサジェストからキーワードを取得中..."):
+    with st.spinner("🔍 Googleサジェストからキーワードを取得中..."), profiler.stage("Googleサジェスト取得"):
         suggestions_list = get_google_suggestions_batch(keyword_input)
         all_keywords.update(suggestions_list)
     
@@ -511,7 +1687,7 @@ if analyze_button and keyword_input:
     
     # 2. リアルタイムキーワード生成
     if enable_realtime:
-        with st.spinner("⚡ リアルタイムキーワードを生成中..."):
+        with st.spinner("⚡ リアルタイムキーワードを生成中..."), profiler.stage("リアルタイム生成"):
             realtime_keywords = get_yahoo_realtime_alternative(keyword_input)
             all_keywords.update(realtime_keywords)
         
@@ -519,16 +1695,25 @@ if analyze_button and keyword_input:
         st.success(f"✅ リアルタイム生成: **{realtime_count}件** のキーワードを追加")
     
     # 3. キーワードのフィルタリングと整理
-    filtered_keywords = []
-    for kw in all_keywords:
-        if len(kw) >= min_keyword_length and kw.strip():
-            filtered_keywords.append(kw.strip())
-    
-    # 重複除去と並び替え
-    filtered_keywords = sorted(list(set(filtered_keywords)))
-    
-    # 最大件数制限
-    if len(filtered_keywords) > max_results:
+    with profiler.stage("フィルタリング・並び替え"):
+        filtered_keywords = []
+        for kw in all_keywords:
+            if len(kw) >= min_keyword_length and kw.strip():
+                filtered_keywords.append(kw.strip())
+        
+        # 重複除去と並び替え
+        filtered_keywords = sorted(list(set(filtered_keywords)))
+    
+    # キーワードをテーマごとにクラスタリング（件数制限の前に全件で実施）
+    # 定型文から生成したリアルタイムキーワードは実際の検索テーマではないため除く
+    suggestion_set = set(suggestions_list)
+    clustering_keywords = [kw for kw in filtered_keywords if kw in suggestion_set]
+    clustered_count = len(clustering_keywords)
+    with st.spinner("🧩 キーワードをテーマごとに分類中..."), profiler.stage("トピック分類"):
+        topic_clusters = cluster_keywords(clustering_keywords, keyword_input)
+    
+    # 最大件数制限（一覧表示・出力のみに適用）
+    if max_results and len(filtered_keywords) > max_results:
         filtered_keywords = filtered_keywords[:max_results]
         st.warning(f"⚠️ 結果が{max_results}件に制限されました。サイドバーで上限を調整できます。")
     
@@ -538,53 +1723,53 @@ if analyze_button and keyword_input:
         st.success(f"🎉 **合計 {total_count}件** のキーワードを取得・生成しました！")
         
         # タブで結果を分類表示
-        tab1, tab2, tab3 = st.tabs(["📊 全キーワード一覧", "📥 データ出力", "🤖 ChatGPT連携"])
+        tab1, tab2, tab3, tab4 = st.tabs(["📊 全キーワード一覧", "🧩 トピック分類", "📥 データ出力", "🤖 ChatGPT連携"])
         
         with tab1:
-            # キーワード一覧をデータフレームで表示
-            df = pd.DataFrame(filtered_keywords, columns=["キーワード"])
-            df["文字数"] = df["キーワード"].str.len()
-            df["種別"] = df["キーワード"].apply(
-                lambda x: "トレンド系" if any(word in x for word in ["最新", "今", "現在", "話題", "速報"]) 
-                else "疑問系" if any(word in x for word in ["とは", "方法", "やり方", "なぜ"]) 
-                else "一般"
-            )
-            
-            # フィルタ機能
-            col1, col2, col3 = st.columns(3)
-            with col1:
-                filter_type = st.selectbox("種別フィルタ", ["全て", "一般", "疑問系", "トレンド系"])
-            with col2:
-                min_chars = st.number_input("最小文字数", min_value=1, value=1)
-            with col3:
-                max_chars = st.number_input("最大文字数", min_value=1, value=50)
-            
-            # フィルタ適用
-            filtered_df = df.copy()
-            if filter_type != "全て":
-                filtered_df = filtered_df[filtered_df["種別"] == filter_type]
-            filtered_df = filtered_df[
-                (filtered_df["文字数"] >= min_chars) & 
-                (filtered_df["文字数"] <= max_chars)
-            ]
+            # キーワード一覧をデータフレームで表示（ページ単位で送信）
+            with profiler.stage("DataFrame構築・種別分類"):
+                df = build_keyword_frame(filtered_keywords)
             
+            render_results_view(ResultsView(df), key="results")
+        
+        with tab2:
+            st.subheader("🧩 トピック分類")
+            st.caption(f"全{clustered_count}件のキーワードを、共起するトークンをもとに **{len(topic_clusters)}個** のテーマに分類しました")
+
+            topics_df = pd.DataFrame({
+                "テーマ": [c["theme"] for c in topic_clusters],
+                "代表キーワード": [c["representative"] for c in topic_clusters],
+                "件数": [c["size"] for c in topic_clusters],
+                "キーワード例": ["、".join(c["keywords"][:5]) for c in topic_clusters],
+            })
             st.dataframe(
-                filtered_df,
+                topics_df,
                 height=400,
                 use_container_width=True,
                 column_config={
-                    "キーワード": st.column_config.TextColumn("キーワード", width="large"),
-                    "文字数": st.column_config.NumberColumn("文字数", width="small"),
-                    "種別": st.column_config.TextColumn("種別", width="medium")
+                    "テーマ": st.column_config.TextColumn("テーマ", width="medium"),
+                    "代表キーワード": st.column_config.TextColumn("代表キーワード", width="medium"),
+                    "件数": st.column_config.NumberColumn("件数", width="small"),
+                    "キーワード例": st.column_config.TextColumn("キーワード例", width="large")
                 }
             )
-        
-        with tab2:
+
+        with tab3:
             st.subheader("📥 データ出力")
             
-            # CSV出力
-            csv = df.to_csv(index=False).encode('utf-8-sig')
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            with profiler.stage("エクスポート生成"):
+                # CSV出力
+                csv = df.to_csv(index=False).encode('utf-8-sig')
+                timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                
+                # JSON形式での出力
+                json_data = {
+                    "base_keyword": keyword_input,
+                    "timestamp": timestamp,
+                    "total_count": total_count,
+                    "keywords": filtered_keywords
+                }
+                json_str = json.dumps(json_data, ensure_ascii=False, indent=2)
             
             col1, col2 = st.columns(2)
             with col1:
@@ -597,15 +1782,6 @@ if analyze_button and keyword_input:
                 )
             
             with col2:
-                # JSON形式での出力
-                json_data = {
-                    "base_keyword": keyword_input,
-                    "timestamp": timestamp,
-                    "total_count": total_count,
-                    "keywords": filtered_keywords
-                }
-                json_str = json.dumps(json_data, ensure_ascii=False, indent=2)
-                
                 st.download_button(
                     label="📥 JSONファイルでダウンロード",
                     data=json_str.encode('utf-8'),
@@ -614,7 +1790,7 @@ if analyze_button and keyword_input:
                     use_container_width=True
                 )
         
-        with tab3:
+        with tab4:
             st.subheader("🤖 ChatGPT連携プロンプト")
             
             # プロンプトテンプレートの選択
@@ -624,7 +1800,12 @@ if analyze_button and keyword_input:
             )
             
             # キーワードリストを整形
-            formatted_keywords = "\n".join([f"- {kw}" for kw in filtered_keywords[:50]])  # 上位50件のみ
+            # 各テーマの代表キーワードを1件ずつ使用（件数の多い上位50テーマ）
+            with profiler.stage("プロンプト生成"):
+                formatted_keywords = "\n".join([
+                    f"- {c['representative']}（テーマ: {c['theme']}／{c['size']}件）"
+                    for c in topic_clusters[:50]
+                ])
             
             # プロンプトテンプレート
             prompts = {
@@ -645,7 +1826,7 @@ if analyze_button and keyword_input:
 【SEOポイント】：（検索上位を狙うためのポイント）
 ---
 
-# 分析対象キーワード（{total_count}件から抜粋）
+# 分析対象キーワード（{clustered_count}件をテーマ分けした代表キーワード）
 {formatted_keywords}""",
 
                 "SEO記事構成": f"""SEOライターとして、以下のキーワード群から1つのメインキーワードを選び、検索上位を狙える記事構成を作成してください。
@@ -732,9 +1913,133 @@ if analyze_button and keyword_input:
     else:
         st.error("❌ キーワードの取得に失敗しました。時間をおいて再度お試しください。")
 
+if analyze_button and keyword_input:
+    profiler = PipelineProfiler(enable_profiling, lock=get_profiling_lock())
+    profiler.start()
+    try:
+        run_keyword_analysis(keyword_input, profiler)
+    finally:
+        # 途中で例外・再実行が起きても計測を必ず止める
+        profiler.stop()
+
+    if profiler.skipped:
+        st.info("💡 他のセッションでプロファイリング中のため、今回の分析は計測しませんでした")
+    elif profiler.enabled:
+        render_profile_report(profiler, keyword_input)
+
 elif analyze_button and not keyword_input:
     st.warning("⚠️ キーワードを入力してください。")
 
+# 一括分析処理
+if bulk_button and seed_file is not None:
+    st.subheader("📂 一括分析結果")
+
+    try:
+        seeds = parse_seed_file(seed_file.getvalue(), seed_file.name)
+    except ValueError as e:
+        seeds = None
+        st.error(f"❌ {e}")
+
+    if seeds:
+        total_requests = len(seeds) * len(build_suggest_queries(seeds[0]))
+        st.info(f"💡 {len(seeds)}件のシード（計{total_requests}リクエスト）を取得します。目安: 約{total_requests / suggest_runtime['rate_limiter'].rate:.0f}秒")
+
+        overall_bar = st.progress(0)
+        seed_progress_area = st.empty()
+        last_rendered = [0.0]
+
+        def render_seed_progress(completed, per_seed_total):
+            # 画面更新の負荷を抑えるため一定間隔でのみ再描画
+            now = time.monotonic()
+            if now - last_rendered[0] < 0.5:
+                return
+            last_rendered[0] = now
+            overall_bar.progress(sum(completed.values()) / (per_seed_total * len(completed)))
+            seed_progress_area.dataframe(
+                pd.DataFrame({
+                    "シード": list(completed),
+                    "進捗": [count * 100 // per_seed_total for count in completed.values()],
+                }),
+                height=250,
+                use_container_width=True,
+                column_config={
+                    "進捗": st.column_config.ProgressColumn("進捗", min_value=0, max_value=100, format="%d%%")
+                }
+            )
+
+        bulk_started = time.perf_counter()
+        runtime = get_suggest_runtime()
+        with runtime["activity"].interactive():
+            seed_results, bulk_errors = collect_bulk_suggestions(
+                seeds,
+                session=runtime["session"],
+                cache=runtime["cache"],
+                executor=runtime["executor"],
+                rate_limiter=runtime["rate_limiter"],
+                max_workers=runtime["max_workers"],
+                progress_callback=render_seed_progress
+            )
+        bulk_elapsed = time.perf_counter() - bulk_started
+        overall_bar.empty()
+        seed_progress_area.empty()
+
+        # 全シードの結果を1つの表に統合
+        bulk_rows = [
+            (seed, kw)
+            for seed, keywords in seed_results.items()
+            for kw in keywords
+            if len(kw) >= min_keyword_length
+        ]
+        bulk_df = build_keyword_frame(
+            [kw for _, kw in bulk_rows],
+            seeds=[seed for seed, _ in bulk_rows]
+        )
+
+        st.success(f"🎉 {len(seeds)}件のシードから **合計 {len(bulk_df)}件** のキーワードを取得しました（{bulk_elapsed:.1f}秒）")
+        if bulk_errors:
+            with st.expander(f"⚠️ {len(bulk_errors)}件のリクエストでエラーが発生しました（詳細を見る）"):
+                for error in bulk_errors[:5]:
+                    st.text(error)
+
+        st.dataframe(
+            pd.DataFrame({
+                "シード": list(seed_results),
+                "取得件数": [len(keywords) for keywords in seed_results.values()],
+            }),
+            use_container_width=True
+        )
+        render_results_view(ResultsView(bulk_df), key="bulk_results")
+
+        bulk_timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+        bulk_col1, bulk_col2 = st.columns(2)
+        with bulk_col1:
+            st.download_button(
+                label="📥 統合CSVをダウンロード",
+                data=bulk_df.to_csv(index=False).encode('utf-8-sig'),
+                file_name=f"bulk_keywords_{bulk_timestamp}.csv",
+                mime="text/csv",
+                use_container_width=True
+            )
+        with bulk_col2:
+            bulk_json = {
+                "seeds": seeds,
+                "timestamp": bulk_timestamp,
+                "total_count": len(bulk_df),
+                "keywords": {
+                    seed: group["キーワード"].tolist()
+                    for seed, group in bulk_df.groupby("シード", sort=False)
+                }
+            }
+            st.download_button(
+                label="📥 統合JSONをダウンロード",
+                data=json.dumps(bulk_json, ensure_ascii=False, indent=2).encode('utf-8'),
+                file_name=f"bulk_keywords_{bulk_timestamp}.json",
+                mime="application/json",
+                use_container_width=True
+            )
+    elif seeds is not None:
+        st.warning("⚠️ ファイルにシードキーワードが見つかりませんでした。")
+
 # フッター
 st.markdown("---")
 col1, col2, col3 = st.columns(3)
@@ -764,6 +2069,10 @@ with st.expander("⚠️ 利用上の注意"):
     ### オプション機能
     - 実際のGoogleトレンドを使いたい場合：`pip install pytrends`
     - なくても全機能が正常に動作します
+    - トレンド・追跡キーワードはバックグラウンドで先読みされ、クリック後すぐに結果を表示できます
+      （追跡キーワードは `tracked_seeds.txt` または環境変数 `KEYWORD_GENIE_TRACKED_SEEDS` で設定、`KEYWORD_GENIE_PREFETCH=0` で無効化）
+    - 他のツールから使いたい場合：`python app.py --serve --port 8765` でHTTP APIを起動
+      （`/api/suggest`・`/api/realtime`・`/api/trends`・`/api/classify` に `?q=キーワード&page=1&per_page=100` でアクセス）
     
     ### 利用規約
     - 本ツールは教育・研究目的での利用を想定しています
@@ -771,6 +2080,7 @@ with st.expander("⚠️ 利用上の注意"):
     - 適切な間隔を空けてリクエストを実行しています
     
     ### プライバシー
-    - 入力されたキーワードは保存されません
+    - 入力されたキーワードはファイル等に保存されません
+    - 取得結果は高速化のため、一定時間（初期設定1時間）サーバーのメモリ上にキャッシュされます
     - セッション終了時にすべてのデータが削除されます
     """)
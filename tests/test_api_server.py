@@ -0,0 +1,103 @@
+"""
+HTTP APIサーバーのテスト（ローカルのスタブサジェストサーバーを使い、オフラインで実行）
+"""
+import importlib
+import json
+import os
+import sys
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class StubSuggestHandler(BaseHTTPRequestHandler):
+    """
+    Googleサジェスト互換のJSONを返すスタブ（"slow" を含むクエリは応答を遅らせる）
+    """
+
+    def do_GET(self):
+        query = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)["q"][0]
+        if "slow" in query:
+            time.sleep(3)
+        body = json.dumps([query, [f"{query} 方法", f"{query} おすすめ"]]).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def _start(server):
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+@pytest.fixture(scope="module")
+def api_url():
+    stub = _start(ThreadingHTTPServer(("127.0.0.1", 0), StubSuggestHandler))
+    os.environ["KEYWORD_GENIE_SUGGEST_URL"] = f"http://127.0.0.1:{stub.server_address[1]}/complete?q={{}}"
+    os.environ["KEYWORD_GENIE_PREFETCH"] = "0"
+    sys.path.insert(0, ROOT_DIR)
+    app = importlib.import_module("app")
+
+    server = _start(app.create_api_server(port=0, max_workers=10, rate_limit=1000))
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    stub.shutdown()
+
+
+def request_json(url, data=None, headers=None):
+    request = urllib.request.Request(url, data=data, headers=headers or {})
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+def test_suggest_paginates_results(api_url):
+    status, first = request_json(f"{api_url}/api/suggest?q=alpha&per_page=10")
+    assert status == 200
+    assert first["partial"] is False
+    assert first["total"] > 10
+    assert first["has_next"] is True
+    assert len(first["items"]) == 10
+
+    _, second = request_json(f"{api_url}/api/suggest?q=alpha&per_page=10&page=2")
+    assert second["items"] and not set(first["items"]) & set(second["items"])
+
+
+def test_suggest_returns_partial_results_on_timeout(api_url):
+    status, result = request_json(f"{api_url}/api/suggest?q=slow&timeout=1")
+    assert status == 200
+    assert result["partial"] is True
+    assert any("タイムアウト" in error for error in result["errors"])
+
+
+def test_classify_posted_keywords(api_url):
+    body = json.dumps({"keywords": ["最新 x", "x とは", "x"]}).encode("utf-8")
+    status, result = request_json(f"{api_url}/api/classify", data=body)
+    assert status == 200
+    assert [item["type"] for item in result["items"]] == ["トレンド系", "疑問系", "一般"]
+
+
+@pytest.mark.parametrize("path, data, expected", [
+    ("/api/suggest", None, 400),
+    ("/api/suggest?q=x&page=abc", None, 400),
+    ("/api/classify", b"\xff\xfe", 400),
+    ("/api/unknown", None, 404),
+    ("/api/suggest?q=x", b"{}", 405),
+])
+def test_error_responses(api_url, path, data, expected):
+    status, result = request_json(f"{api_url}{path}", data=data)
+    assert status == expected
+    assert "error" in result